@@ -1,23 +1,12 @@
 import os
+import re
 import json
-import hashlib
 import time
-import logging
-from rich.console import Console
-from rich.table import Table
-from rich.text import Text
+from concurrent.futures import ThreadPoolExecutor
+from staging import read_index
+from utils import console, logger, hash_file, new_hasher, write_durable, HASH_ALGORITHMS
 
 
-# Initialize rich console for output
-console = Console()
-
-# Configure logging
-logging.basicConfig(
-    filename="myscs.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
 def commit(commit_message):
     """
     Commit the staged files to the repository with a given commit message.
@@ -25,80 +14,291 @@ def commit(commit_message):
     index_path = ".myscs/index"
 
     # Step 1: Check if the index is empty (no staged files)
-    if not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+    try:
+        index_st = os.stat(index_path)
+    except FileNotFoundError:
+        index_st = None
+    if index_st is None or index_st.st_size == 0:
         print("No files staged for commit.")
-        logging.warning("Commit attempt with no staged files.")
+        logger.warning("Commit attempt with no staged files.")
         return
 
-    # Step 2: Read staged files from the index
+    # Step 2: Read staged files from the index (one entry per path)
     staged_files = []
+    stat_cache = {}  # file_path -> (size, mtime_ns, ctime_ns, inode) recorded at stage time
     try:
-        with open(index_path, "r") as index_file:
-            for line in index_file:
-                file_path, file_hash = line.strip().split()
-                staged_files.append((file_path, file_hash))
+        algorithm, index_entries = read_index(index_path)
+        for file_path, fields in index_entries.items():
+            if len(fields) == 6:
+                stat_cache[file_path] = tuple(int(field) for field in fields[2:])
+            staged_files.append((file_path, fields[1]))
     except Exception as e:
         print(f"Error reading index file: {str(e)}")
-        logging.error(f"Error reading index file: {str(e)}")
+        logger.error("Error reading index file: %s", e)
+        return
+
+    if algorithm not in HASH_ALGORITHMS:
+        print(f"Error: Index uses unsupported hash algorithm '{algorithm}'.")
+        logger.error("Index uses unsupported hash algorithm %s.", algorithm)
         return
 
-    # Step 3: Validate staged files
+    if not staged_files:
+        print("No files staged for commit.")
+        logger.warning("Commit attempt with no staged files.")
+        return
+
+    # Step 3: Validate staged files, reporting every problem before aborting
+    failed = False
+    expected = {}  # file_path -> staged hash, for files that need rehashing
+    sizes = {}
     for file_path, file_hash in staged_files:
-        if not os.path.exists(file_path):
-            print(f"Error: Staged file '{file_path}' does not exist.")
-            logging.error(f"Staged file '{file_path}' missing during commit.")
-            return
-        # Verify file hash
-        hasher = hashlib.sha1()
+        # Skip rehashing when the stat data shows the file is untouched
         try:
-            with open(file_path, "rb") as f:
-                while chunk := f.read(8192):
-                    hasher.update(chunk)
-            if hasher.hexdigest() != file_hash:
-                print(f"Error: File '{file_path}' has been modified since staging.")
-                logging.error(f"File '{file_path}' hash mismatch during commit.")
-                return
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            print(f"Error: Staged file '{file_path}' does not exist.")
+            logger.error("Staged file '%s' missing during commit.", file_path)
+            failed = True
+            continue
         except Exception as e:
             print(f"Error reading staged file '{file_path}': {str(e)}")
-            logging.error(f"Error reading staged file '{file_path}': {str(e)}")
-            return
+            logger.error("Error reading staged file '%s': %s", file_path, e)
+            failed = True
+            continue
+        # Like git, entries modified no earlier than the index was written are
+        # "racy": a same-size change in the same clock tick would go unnoticed
+        staged_stat = stat_cache.get(file_path)
+        if (staged_stat != (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+                or staged_stat[1] >= index_st.st_mtime_ns):
+            expected[file_path] = file_hash
+            sizes[file_path] = st.st_size
+
+    # Rehash in parallel (hashlib releases the GIL), then compare in one pass
+    if expected:
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            actuals = dict(pool.map(_try_hash_file, expected, [algorithm] * len(expected),
+                                    [sizes[file_path] for file_path in expected]))
+        for file_path, file_hash in expected.items():
+            actual_hash, error = actuals[file_path]
+            if error is not None:
+                print(f"Error reading staged file '{file_path}': {str(error)}")
+                logger.error("Error reading staged file '%s': %s", file_path, error)
+                failed = True
+            elif actual_hash != file_hash:
+                print(f"Error: File '{file_path}' has been modified since staging.")
+                logger.error("File '%s' hash mismatch during commit.", file_path)
+                failed = True
+    if failed:
+        return
 
     # Step 4: Create the commit object data
     commit_data = {
         "commit_message": commit_message,
         "timestamp": time.time(),
         "parent_commit": get_current_commit_hash(),  # Reference to the parent commit
-        "files": staged_files
+        "files": staged_files,
+        "hash_algorithm": algorithm
     }
-    commit_data_str = json.dumps(commit_data, indent=4)
+    # Canonical compact form: identical commits always hash identically
+    commit_bytes = json.dumps(commit_data, separators=(',', ':'), sort_keys=True).encode('utf-8')
 
     # Step 5: Calculate the hash for the commit object
-    commit_hash = hashlib.sha1(commit_data_str.encode('utf-8')).hexdigest()
+    commit_hash = new_hasher(commit_bytes, algorithm).hexdigest()
 
     # Step 6: Save the commit object to the object directory
     commit_path = f".myscs/objects/{commit_hash}"
     try:
-        with open(commit_path, "w") as commit_file:
-            commit_file.write(commit_data_str)
-        logging.info(f"Commit object created with hash {commit_hash}")
+        write_durable(commit_path, commit_bytes)
+        _write_commit_meta(commit_hash, commit_data)
+        logger.info("Commit object created with hash %s", commit_hash)
     except Exception as e:
         print(f"Error saving commit object: {str(e)}")
-        logging.error(f"Error saving commit object: {str(e)}")
+        logger.error("Error saving commit object: %s", e)
         return
 
     # Step 7: Update HEAD to point to the new commit
     try:
-        with open(".myscs/HEAD", "w") as head_file:
-            head_file.write(f"ref: refs/heads/main\n{commit_hash}")
-        logging.info("HEAD updated to new commit.")
+        write_durable(".myscs/HEAD", f"ref: refs/heads/main\n{commit_hash}".encode('utf-8'))
+        # One metadata flush per directory persists both renames
+        _fsync_dir(".myscs/objects")
+        _fsync_dir(".myscs")
+        logger.info("HEAD updated to new commit.")
     except Exception as e:
         print(f"Error updating HEAD: {str(e)}")
-        logging.error(f"Error updating HEAD: {str(e)}")
+        logger.error("Error updating HEAD: %s", e)
         return
 
+    # Record the commit in the linear history cache used by view_commit_history
+    _append_history_cache(commit_hash, commit_data)
+
     # Step 8: Provide feedback
     print(f"Commit successful. Commit hash: {commit_hash}")
-    logging.info("Commit completed successfully.")
+    logger.info("Commit completed successfully.")
+
+def _try_hash_file(file_path, algorithm, size):
+    """
+    Hash a staged file for verification.
+    Returns (file_path, (hash, None)) on success or (file_path, (None, error)).
+    """
+    try:
+        return file_path, (hash_file(file_path, algorithm, size), None)
+    except Exception as e:
+        return file_path, (None, e)
+
+def _fsync_dir(dir_path):
+    """
+    Flush a directory's metadata (e.g. renames) to disk.
+    Not supported on Windows, where this is a no-op.
+    """
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# HEAD content: an optional branch reference followed by a SHA-1 (40 hex
+# characters) or SHA-256/BLAKE3 (64 hex characters) commit hash
+_HEAD_RE = re.compile(r"^(?:ref: refs/heads/\S+\s+)?([0-9a-f]{64}|[0-9a-f]{40})\s*$")
+
+# Cached HEAD and branch file contents, reused until the file's stat changes
+_head_cache = {"stat": None, "value": None}
+_branch_cache = {}  # branch_name -> {"stat": ..., "value": ...}
+
+# Files modified more recently than this are not cached: with coarse
+# timestamps a same-size rewrite could leave their stat unchanged
+_RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+def _read_cached(path, cache):
+    """
+    Return the stripped contents of path, re-reading it only when its
+    (mtime_ns, ctime_ns, size, inode, device) differ from the cached entry.
+    Files modified within the racy window are always re-read.
+    Returns None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stat_key = (st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino, st.st_dev)
+    if cache["stat"] == stat_key:
+        return cache["value"]
+    with open(path, "r") as f:
+        value = f.read().strip()
+    if time.time_ns() - st.st_mtime_ns >= _RACY_WINDOW_NS:
+        cache.update(stat=stat_key, value=value)
+    else:
+        cache.update(stat=None, value=None)
+    return value
+
+# commit_hash -> (parent_commit, timestamp, first line of commit message)
+_commit_meta_cache = {}
+
+def _write_commit_meta(commit_hash, commit_data):
+    """
+    Write the .meta sidecar for a commit object: parent, timestamp and the
+    first line of the message, one per line. History walks read this instead
+    of parsing the full commit object. The sidecar is only a cache of data in
+    the commit object, so it is written without fsync or rename.
+    """
+    parent = commit_data["parent_commit"] or ""
+    message = commit_data["commit_message"].split("\n")[0]
+    meta = f"{parent}\n{commit_data['timestamp']!r}\n{message}\n"
+    with open(f".myscs/objects/{commit_hash}.meta", "wb") as meta_file:
+        meta_file.write(meta.encode('utf-8'))
+    _commit_meta_cache[commit_hash] = (parent or None, commit_data["timestamp"], message)
+
+def _read_commit_meta(commit_hash):
+    """
+    Return (parent_commit, timestamp, message) for a commit, or None if the
+    commit object does not exist. Falls back to the full commit object for
+    commits created before .meta sidecars existed or whose sidecar is unreadable.
+    """
+    if commit_hash in _commit_meta_cache:
+        return _commit_meta_cache[commit_hash]
+
+    commit_path = f".myscs/objects/{commit_hash}"
+    try:
+        with open(f"{commit_path}.meta", "rb") as meta_file:
+            parent, timestamp, message = meta_file.read().split(b"\n")[:3]
+        meta = (parent.decode('utf-8') or None, float(timestamp), message.decode('utf-8'))
+    except (FileNotFoundError, ValueError):
+        if not os.path.exists(commit_path):
+            return None
+        # Commit objects are UTF-8 JSON bytes; json.loads decodes them directly
+        with open(commit_path, "rb") as commit_file:
+            commit_data = json.loads(commit_file.read())
+        meta = (commit_data.get("parent_commit"), commit_data["timestamp"], commit_data["commit_message"].split("\n")[0])
+
+    _commit_meta_cache[commit_hash] = meta
+    return meta
+
+# One compact JSON line per commit, appended in commit order
+HISTORY_CACHE_PATH = ".myscs/history_cache.jsonl"
+
+def _append_history_cache(commit_hash, commit_data):
+    """
+    Append a {hash, parent, ts, msg} line for a new commit to the history cache.
+    The cache is an optimization only, so failures are logged and ignored.
+    """
+    entry = {
+        "hash": commit_hash,
+        "parent": commit_data["parent_commit"],
+        "ts": commit_data["timestamp"],
+        "msg": commit_data["commit_message"].split("\n")[0],
+    }
+    try:
+        with open(HISTORY_CACHE_PATH, "ab") as cache_file:
+            cache_file.write(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b"\n")
+    except Exception as e:
+        logger.warning("Could not update history cache: %s", e)
+
+def _read_history_cache(head_hash):
+    """
+    Return (entries, next_hash) for the history reachable from head_hash using
+    the history cache, where entries are (hash, parent, timestamp, message)
+    newest first and next_hash is the first ancestor the cache could not supply
+    (None if the walk reached the root). Returns None if the cache is missing
+    or its newest entry is not head_hash.
+    """
+    try:
+        with open(HISTORY_CACHE_PATH, "rb") as cache_file:
+            lines = cache_file.read().splitlines()
+    except FileNotFoundError:
+        return None
+    try:
+        if not lines or json.loads(lines[-1])["hash"] != head_hash:
+            return None
+
+        # Walk the lines newest first, following parent pointers; lines for
+        # commits on other lines of history are skipped
+        entries = []
+        next_hash = head_hash
+        for line in reversed(lines):
+            if next_hash is None:
+                break
+            entry = json.loads(line)
+            if entry["hash"] == next_hash:
+                entries.append((entry["hash"], entry["parent"], entry["ts"], entry["msg"]))
+                next_hash = entry["parent"]
+    except (ValueError, KeyError) as e:
+        logger.warning("Ignoring corrupt history cache: %s", e)
+        return None
+    return entries, next_hash
+
+def _invalidate_history_cache():
+    """
+    Remove the history cache so the next history view walks the object store.
+    """
+    try:
+        os.remove(HISTORY_CACHE_PATH)
+    except FileNotFoundError:
+        pass
+
 def get_current_commit_hash():
     """
     Get the current commit hash from the HEAD file.
@@ -106,48 +306,38 @@ def get_current_commit_hash():
     """
     head_path = ".myscs/HEAD"
     try:
-        if os.path.exists(head_path):
-            with open(head_path, "r") as head_file:
-                content = head_file.read().strip()
-                
-                # Handle case where HEAD contains a reference and a hash
-                if "ref: refs/heads/main" in content:
-                    lines = content.splitlines()  # Split into lines
-                    if len(lines) > 1:  # If there's a second line, assume it's the hash
-                        return lines[1]
-                    else:
-                        logging.error("HEAD file reference found but no commit hash.")
-                        return None
-
-                # Handle case where HEAD directly contains a commit hash
-                elif len(content) == 40:  # SHA-1 hashes are 40 characters long
-                    return content
-
-                else:
-                    logging.warning("Unrecognized HEAD file format.")
-                    return None
+        content = _read_cached(head_path, _head_cache)
+        if content is not None:
+            # Either "ref: refs/heads/<branch>" followed by the hash, or a bare hash
+            match = _HEAD_RE.match(content)
+            if match:
+                return match.group(1)
+            if content.startswith("ref: refs/heads/"):
+                logger.error("HEAD file reference found but no commit hash.")
+            else:
+                logger.warning("Unrecognized HEAD file format.")
+            return None
 
     except Exception as e:
-        logging.error(f"Error reading HEAD file: {str(e)}")
+        logger.error("Error reading HEAD file: %s", e)
     return None  # Return None if no valid commit hash is found
 
 def view_commit_history():
     """
     Display the commit history, starting from the latest commit (HEAD).
     """
-    head_path = ".myscs/HEAD"
-    if not os.path.exists(head_path):
-        console.print("[bold red]No commits found. Repository is empty.[/bold red]")
-        logging.warning("Attempted to view commit history, but no HEAD found.")
-        return
+    from rich.table import Table
 
     # Read HEAD to get the latest commit hash
-    with open(head_path, "r") as head_file:
-        head_content = head_file.read().strip()
+    head_content = _read_cached(".myscs/HEAD", _head_cache)
+    if head_content is None:
+        console().print("[bold red]No commits found. Repository is empty.[/bold red]")
+        logger.warning("Attempted to view commit history, but no HEAD found.")
+        return
 
     if "ref: refs/heads/main" not in head_content:
-        console.print("[bold red]Invalid HEAD reference.[/bold red]")
-        logging.error("HEAD does not point to a valid commit.")
+        console().print("[bold red]Invalid HEAD reference.[/bold red]")
+        logger.error("HEAD does not point to a valid commit.")
         return
 
     current_commit_hash = head_content.split("\n")[-1]
@@ -158,25 +348,30 @@ def view_commit_history():
     table.add_column("Message", style="magenta")
     table.add_column("Timestamp", style="dim")
 
-    # Traverse commit history
+    # Use the history cache for as much of the history as it covers
+    cached_history = _read_history_cache(current_commit_hash)
+    if cached_history is not None:
+        entries, current_commit_hash = cached_history
+        for commit_hash, parent_commit, commit_timestamp, commit_message in entries:
+            table.add_row(commit_hash[:7], commit_message, time.ctime(commit_timestamp))
+
+    # Traverse the rest of the commit history from the object store
     while current_commit_hash:
-        commit_path = f".myscs/objects/{current_commit_hash}"
-        if not os.path.exists(commit_path):
-            console.print(f"[bold red]Commit object {current_commit_hash} not found.[/bold red]")
-            logging.error(f"Commit object {current_commit_hash} not found.")
+        commit_meta = _read_commit_meta(current_commit_hash)
+        if commit_meta is None:
+            console().print(f"[bold red]Commit object {current_commit_hash} not found.[/bold red]")
+            logger.error("Commit object %s not found.", current_commit_hash)
             break
 
-        # Read and display commit data
-        with open(commit_path, "r") as commit_file:
-            commit_data = json.load(commit_file)
-            commit_timestamp = time.ctime(commit_data['timestamp'])
-            table.add_row(current_commit_hash[:7], commit_data['commit_message'], commit_timestamp)
+        # Display commit data
+        parent_commit, commit_timestamp, commit_message = commit_meta
+        table.add_row(current_commit_hash[:7], commit_message, time.ctime(commit_timestamp))
 
         # Get the parent commit hash
-        current_commit_hash = commit_data.get("parent_commit")
+        current_commit_hash = parent_commit
 
     # Display the table
-    console.print(table)
+    console().print(table)
    
 
 def merge(target_branch):
@@ -184,36 +379,38 @@ def merge(target_branch):
     Merge the current branch with the target branch.
     If the branches have diverged, a three-way merge is performed.
     """
+    from rich.text import Text
+
     current_branch = get_current_branch()  # Get the current active branch
     if current_branch == target_branch:
         # Show warning in yellow if the target is the same as the current branch
-        console.print(Text(f"You are already on the target branch '{target_branch}'.", style="yellow"))
+        console().print(Text(f"You are already on the target branch '{target_branch}'.", style="yellow"))
         return
 
     target_commit_hash = get_commit_hash_for_branch(target_branch)
     if not target_commit_hash:
         # Show error in red if the target branch doesn't exist
-        console.print(Text(f"Error: Branch '{target_branch}' does not exist.", style="bold red"))
+        console().print(Text(f"Error: Branch '{target_branch}' does not exist.", style="bold red"))
         return
 
     # Perform a simple merge or three-way merge
     merge_result = perform_merge(current_branch, target_branch)
     if merge_result:
+        # A merge can rewrite history, so the linear history cache is no longer valid
+        _invalidate_history_cache()
         # Show success in green if the merge is successful
-        console.print(Text(f"Merge successful. Merged {target_branch} into {current_branch}.", style="bold green"))
+        console().print(Text(f"Merge successful. Merged {target_branch} into {current_branch}.", style="bold green"))
     else:
         # Show error in red if merge conflicts occur
-        console.print(Text(f"Merge conflict detected. Unable to merge {target_branch} into {current_branch}.", style="bold red"))
+        console().print(Text(f"Merge conflict detected. Unable to merge {target_branch} into {current_branch}.", style="bold red"))
 
 def get_commit_hash_for_branch(branch_name):
     """
     Get the commit hash for the specified branch from the .myscs/refs/heads directory.
     """
     branch_path = f".myscs/refs/heads/{branch_name}"
-    if os.path.exists(branch_path):
-        with open(branch_path, "r") as branch_file:
-            return branch_file.read().strip()
-    return None
+    cache = _branch_cache.setdefault(branch_name, {"stat": None, "value": None})
+    return _read_cached(branch_path, cache)
 
 def perform_merge(current_branch, target_branch):
     """
@@ -230,12 +427,9 @@ def get_current_branch():
     """
     Retrieve the current branch from HEAD or refs/heads.
     """
-    head_path = ".myscs/HEAD"
-    if os.path.exists(head_path):
-        with open(head_path, "r") as head_file:
-            content = head_file.read().strip()
-            if content.startswith("ref: refs/heads/"):
-                return content.split('/')[-1]
+    content = _read_cached(".myscs/HEAD", _head_cache)
+    if content is not None and content.startswith("ref: refs/heads/"):
+        return content.split('/')[-1]
     return None
 
 if __name__ == "__main__":
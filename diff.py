@@ -84,8 +84,8 @@ def get_commit_history(commit_hash):
         commit_path = f".myscs/objects/{commit_hash}"
         if not os.path.exists(commit_path):
             break
-        with open(commit_path, "r") as commit_file:
-            commit_data = json.load(commit_file)
+        with open(commit_path, "rb") as commit_file:
+            commit_data = json.loads(commit_file.read())
             commit_history.append({
                 "commit_hash": commit_hash,
                 "commit_message": commit_data.get("commit_message", ""),
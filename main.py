@@ -1,6 +1,6 @@
 import argparse
 from repoinit import initialize_repo
-from staging import stage_file
+from staging import stage_files
 from commit_change import commit, view_commit_history, merge  # Import the commit and log functions
 from branching import create_branch, switch_branch  # Import branch-related functions
 from diff import compare_branches  # Import the compare_branches function for diffing
@@ -15,9 +15,9 @@ def main():
     init_parser.set_defaults(func=initialize_repo)
 
     # 'add' command
-    add_parser = subparsers.add_parser("add", help="Stage a file.")
-    add_parser.add_argument("file_path", help="Path to the file to be staged.")
-    add_parser.set_defaults(func=stage_file)
+    add_parser = subparsers.add_parser("add", help="Stage one or more files.")
+    add_parser.add_argument("file_paths", nargs="+", help="Paths to the files to be staged.")
+    add_parser.set_defaults(func=stage_files)
 
     # 'commit' command
     commit_parser = subparsers.add_parser("commit", help="Commit staged changes.")
@@ -58,9 +58,9 @@ def main():
 
     args = parser.parse_args()
     if args.command:
-        # Check if a file path is provided for 'add'
+        # Check if file paths are provided for 'add'
         if args.command == "add":
-            args.func(args.file_path)
+            args.func(args.file_paths)
         # Check if a commit message is provided for 'commit'
         elif args.command == "commit":
             args.func(args.commit_message)
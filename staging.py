@@ -1,47 +1,132 @@
 import os
-import logging
-import hashlib
-from rich.console import Console
+import json
+from concurrent.futures import ThreadPoolExecutor
+from utils import console, logger, hash_file, write_durable, HASH_ALGORITHM, HASH_ALGORITHMS, LEGACY_HASH_ALGORITHM
 
-# Initialize rich console for styled output
-console = Console()
+# First line of the index, recording which algorithm its hashes use
+INDEX_HEADER_PREFIX = "# hash: "
 
-# Configure logging
-logging.basicConfig(
-    filename="myscs.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+def read_index(index_path):
+    """
+    Read the index in one call and return (algorithm, entries).
+    algorithm is taken from the header, is the legacy algorithm for indexes
+    without one, and is None for a missing or empty index. entries maps each
+    path to its split index line; a later line for a path replaces an earlier one.
+    """
+    try:
+        with open(index_path, 'r') as index_file:
+            index_lines = [line for line in index_file.read().splitlines() if line]
+    except FileNotFoundError:
+        return None, {}
+    if not index_lines:
+        return None, {}
 
-def stage_file(file_path):
+    algorithm = LEGACY_HASH_ALGORITHM
+    if index_lines[0].startswith(INDEX_HEADER_PREFIX):
+        algorithm = index_lines[0][len(INDEX_HEADER_PREFIX):].strip()
+        index_lines = index_lines[1:]
+
+    entries = {}
+    for fields in [line.split("\t") for line in index_lines]:
+        if len(fields) == 1:
+            # Legacy "path hash" entries carry no stat data
+            fields = fields[0].rsplit(None, 1)
+        entries[fields[0]] = fields
+    return algorithm, entries
+
+def configured_hash_algorithm():
     """
-    Stage a file by adding it to the .myscs/index file.
+    Return the hash algorithm for new indexes: the "hash_algorithm" key of
+    .myscs/config if set, otherwise the default.
+    """
+    try:
+        with open(".myscs/config", "r") as config_file:
+            return json.load(config_file).get("hash_algorithm", HASH_ALGORITHM)
+    except (FileNotFoundError, ValueError):
+        return HASH_ALGORITHM
+
+def stage_files(file_paths):
     """
-    if not os.path.exists(file_path):
-        console.print(f"[bold red]Error:[/bold red] File '{file_path}' not found in the working directory.")
-        logging.warning(f"File {file_path} not found.")
+    Stage several files by adding them to the .myscs/index file.
+    Files are hashed in parallel and new entries are appended in one write;
+    re-staging a path replaces its entry by rewriting the index.
+    The index starts with a header naming the hash algorithm; each following
+    line holds: path, hash, size, mtime_ns, ctime_ns and inode (tab separated).
+    """
+    # Stat each file once, before hashing, so commit can trust it to skip rehashing
+    existing_paths = []
+    stats = []
+    for file_path in file_paths:
+        try:
+            stats.append(os.stat(file_path))
+        except FileNotFoundError:
+            console().print(f"[bold red]Error:[/bold red] File '{file_path}' not found in the working directory.")
+            logger.warning("File %s not found.", file_path)
+            continue
+        existing_paths.append(file_path)
+    if not existing_paths:
         return
 
     try:
-        # Calculate the file hash
-        hasher = hashlib.sha1()
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-        file_hash = hasher.hexdigest()
+        # Hash with the index's algorithm, starting a new index with the default one
+        index_path = ".myscs/index"
+        algorithm, index_entries = read_index(index_path)
+        header = ""
+        if algorithm is None:
+            algorithm = configured_hash_algorithm()
+            header = f"{INDEX_HEADER_PREFIX}{algorithm}\n"
+        if algorithm not in HASH_ALGORITHMS:
+            console().print(f"[bold red]Error:[/bold red] Index uses unsupported hash algorithm '{algorithm}'.")
+            logger.error("Index uses unsupported hash algorithm %s.", algorithm)
+            return
+
+        # Calculate the file hashes
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            file_hashes = list(pool.map(hash_file, existing_paths, [algorithm] * len(existing_paths),
+                                        [st.st_size for st in stats]))
 
         # Ensure the .myscs directory exists
         if not os.path.exists(".myscs"):
             os.mkdir(".myscs")
 
-        # Add the file path and hash to the index
-        index_path = ".myscs/index"
-        with open(index_path, 'a') as index_file:
-            index_file.write(f"{file_path} {file_hash}\n")
+        # Add the file paths, hashes and stat data to the index
+        new_lines = {
+            file_path: f"{file_path}\t{file_hash}\t{st.st_size}\t{st.st_mtime_ns}\t{st.st_ctime_ns}\t{st.st_ino}\n"
+            for file_path, st, file_hash in zip(existing_paths, stats, file_hashes)
+        }
+        if not any(file_path in index_entries for file_path in new_lines):
+            # Only new paths: append them in a single write
+            entries = (header + "".join(new_lines.values())).encode('utf-8')
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+            fd = os.open(index_path, flags, 0o644)
+            try:
+                view = memoryview(entries)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+        else:
+            # Re-staged paths: replace their entries and rewrite the index atomically
+            if algorithm != LEGACY_HASH_ALGORITHM:
+                header = f"{INDEX_HEADER_PREFIX}{algorithm}\n"
+            lines = {
+                file_path: ("\t" if len(fields) > 2 else " ").join(fields) + "\n"
+                for file_path, fields in index_entries.items()
+            }
+            lines.update(new_lines)
+            write_durable(index_path, (header + "".join(lines.values())).encode('utf-8'))
 
-        console.print(f"[bold green]Success:[/bold green] File '{file_path}' staged successfully.")
-        logging.info(f"File {file_path} added to the index with hash {file_hash}.")
+        for file_path, file_hash in zip(existing_paths, file_hashes):
+            console().print(f"[bold green]Success:[/bold green] File '{file_path}' staged successfully.")
+            logger.info("File %s added to the index with hash %s.", file_path, file_hash)
 
     except Exception as e:
-        console.print(f"[bold red]Error:[/bold red] Staging file '{file_path}' failed. Details: {str(e)}")
-        logging.error(f"Error staging the file {file_path}: {str(e)}")
+        paths = ", ".join(existing_paths)
+        console().print(f"[bold red]Error:[/bold red] Staging file '{paths}' failed. Details: {str(e)}")
+        logger.error("Error staging the file %s: %s", paths, e)
+
+def stage_file(file_path):
+    """
+    Stage a file by adding it to the .myscs/index file.
+    """
+    stage_files([file_path])
@@ -0,0 +1,300 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from unittest import mock
+from rich.console import Console
+from staging import stage_file, configured_hash_algorithm
+import commit_change
+from commit_change import commit, get_current_commit_hash, view_commit_history, merge, HISTORY_CACHE_PATH
+from utils import hash_file
+
+
+class TestCommitStagedFiles(unittest.TestCase):
+    def setUp(self):
+        """Create an empty repository in a temporary directory."""
+        self.original_cwd = os.getcwd()
+        self.repo_dir = tempfile.mkdtemp()
+        os.chdir(self.repo_dir)
+        os.makedirs(".myscs/objects")
+        os.makedirs(".myscs/refs/heads")
+        with open(".myscs/HEAD", "w") as head_file:
+            head_file.write("ref: refs/heads/main\n")
+
+    def tearDown(self):
+        """Remove the temporary repository."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.repo_dir)
+
+    def write_old_file(self, file_path, content):
+        """Write a file and backdate its mtime so its index entry is not racy."""
+        with open(file_path, "w") as f:
+            f.write(content)
+        past = time.time() - 100
+        os.utime(file_path, (past, past))
+
+    def test_index_records_stat_data(self):
+        """Test that staged entries use the tab-separated format with stat data."""
+        self.write_old_file("a.txt", "hello")
+        stage_file("a.txt")
+        st = os.stat("a.txt")
+        with open(".myscs/index", "r") as index_file:
+            lines = index_file.read().splitlines()
+        self.assertTrue(lines[0].startswith("# hash: "))
+        self.assertEqual(lines[1].split("\t")[2:],
+                         [str(st.st_size), str(st.st_mtime_ns), str(st.st_ctime_ns), str(st.st_ino)])
+
+    def test_commit_skips_rehash_for_untouched_file(self):
+        """Test that an untouched staged file is trusted without rehashing."""
+        self.write_old_file("a.txt", "hello")
+        stage_file("a.txt")
+        with mock.patch("commit_change.hash_file", wraps=hash_file) as hash_mock:
+            commit("Untouched file")
+        hash_mock.assert_not_called()
+        self.assertIsNotNone(get_current_commit_hash())
+
+    def test_commit_rejects_modified_file(self):
+        """Test that a same-size rewrite with a restored mtime is still rejected."""
+        self.write_old_file("a.txt", "hello")
+        stage_file("a.txt")
+        st = os.stat("a.txt")
+        time.sleep(0.01)
+        with open("a.txt", "w") as f:
+            f.write("HELLO")
+        os.utime("a.txt", ns=(st.st_atime_ns, st.st_mtime_ns))
+        commit("Modified file")
+        self.assertIsNone(get_current_commit_hash())
+
+    def test_commit_reports_every_modified_file(self):
+        """Test that every modified or missing staged file is reported before the commit is aborted."""
+        self.write_old_file("a.txt", "hello")
+        self.write_old_file("b.txt", "world")
+        self.write_old_file("c.txt", "gone")
+        stage_file("a.txt")
+        stage_file("b.txt")
+        stage_file("c.txt")
+        self.write_old_file("a.txt", "hello again")
+        self.write_old_file("b.txt", "world again")
+        os.remove("c.txt")
+        with mock.patch("builtins.print") as print_mock:
+            commit("Modified files")
+        printed = [call.args[0] for call in print_mock.call_args_list]
+        self.assertIn("Error: File 'a.txt' has been modified since staging.", printed)
+        self.assertIn("Error: File 'b.txt' has been modified since staging.", printed)
+        self.assertIn("Error: Staged file 'c.txt' does not exist.", printed)
+        self.assertIsNone(get_current_commit_hash())
+
+    def test_failed_write_leaves_no_temporary_file(self):
+        """Test that a commit whose object cannot be renamed into place cleans up its temporary file."""
+        self.write_old_file("a.txt", "hello")
+        stage_file("a.txt")
+        with mock.patch("utils.os.replace", side_effect=OSError("disk full")):
+            commit("Failed write")
+        self.assertEqual(os.listdir(".myscs/objects"), [])
+        self.assertIsNone(get_current_commit_hash())
+
+    def test_configured_hash_algorithm(self):
+        """Test that .myscs/config selects the hash algorithm of a new index."""
+        self.assertEqual(configured_hash_algorithm(), "sha256")
+        with open(".myscs/config", "w") as config_file:
+            json.dump({"hash_algorithm": "sha1"}, config_file)
+        self.assertEqual(configured_hash_algorithm(), "sha1")
+        self.write_old_file("a.txt", "hello")
+        stage_file("a.txt")
+        with open(".myscs/index", "r") as index_file:
+            lines = index_file.read().splitlines()
+        self.assertEqual(lines[0], "# hash: sha1")
+        self.assertEqual(lines[1].split("\t")[1], hashlib.sha1(b"hello").hexdigest())
+
+    def test_commit_rejects_unsupported_algorithm(self):
+        """Test that commit reports an unknown index hash algorithm instead of raising KeyError."""
+        self.write_old_file("a.txt", "hello")
+        with open(".myscs/index", "w") as index_file:
+            index_file.write(f"# hash: md5\na.txt\t{'0' * 32}\n")
+        with mock.patch("builtins.print") as print_mock:
+            commit("Unknown algorithm")
+        print_mock.assert_called_once_with("Error: Index uses unsupported hash algorithm 'md5'.")
+        self.assertIsNone(get_current_commit_hash())
+
+    def test_stage_rejects_unsupported_algorithm(self):
+        """Test that staging into an index with an unknown hash algorithm reports it and leaves the index alone."""
+        self.write_old_file("a.txt", "hello")
+        with open(".myscs/index", "w") as index_file:
+            index_file.write("# hash: md5\n")
+        with mock.patch("staging.console") as console_mock:
+            stage_file("a.txt")
+        printed = " ".join(str(call) for call in console_mock.return_value.print.call_args_list)
+        self.assertIn("Index uses unsupported hash algorithm 'md5'", printed)
+        with open(".myscs/index", "r") as index_file:
+            self.assertEqual(index_file.read(), "# hash: md5\n")
+
+    def test_commit_legacy_index(self):
+        """Test that a legacy "path hash" index, including a path with a space, still commits."""
+        self.write_old_file("my file.txt", "legacy content")
+        sha1 = hashlib.sha1(b"legacy content").hexdigest()
+        with open(".myscs/index", "w") as index_file:
+            index_file.write(f"my file.txt {sha1}\n")
+        commit("Legacy index")
+        commit_hash = get_current_commit_hash()
+        self.assertEqual(len(commit_hash), 40)
+        with open(f".myscs/objects/{commit_hash}", "r") as commit_file:
+            commit_data = json.load(commit_file)
+        self.assertEqual(commit_data["files"], [["my file.txt", sha1]])
+        self.assertEqual(commit_data["hash_algorithm"], "sha1")
+
+
+class TestHistoryCache(unittest.TestCase):
+    def setUp(self):
+        """Create a repository with three commits in a temporary directory."""
+        self.original_cwd = os.getcwd()
+        self.repo_dir = tempfile.mkdtemp()
+        os.chdir(self.repo_dir)
+        os.makedirs(".myscs/objects")
+        os.makedirs(".myscs/refs/heads")
+        with open(".myscs/HEAD", "w") as head_file:
+            head_file.write("ref: refs/heads/main\n")
+
+        self.commit_hashes = []
+        for number in range(1, 4):
+            with open(f"file{number}.txt", "w") as f:
+                f.write(f"Content {number}")
+            stage_file(f"file{number}.txt")
+            commit(f"Commit {number}")
+            self.commit_hashes.append(get_current_commit_hash())
+
+    def tearDown(self):
+        """Remove the temporary repository."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.repo_dir)
+
+    def read_cache_lines(self):
+        """Return the lines of the history cache."""
+        with open(HISTORY_CACHE_PATH, "r") as cache_file:
+            return cache_file.read().splitlines()
+
+    def write_cache_lines(self, lines):
+        """Replace the history cache with the given lines."""
+        with open(HISTORY_CACHE_PATH, "w") as cache_file:
+            cache_file.write("".join(line + "\n" for line in lines))
+
+    def history_output(self):
+        """Run view_commit_history and return the printed text."""
+        console = Console(record=True, width=200)
+        with mock.patch("commit_change.console", return_value=console):
+            view_commit_history()
+        return console.export_text()
+
+    def assert_full_history(self):
+        """Check that the history view lists all three commits."""
+        output = self.history_output()
+        for number in range(1, 4):
+            self.assertIn(f"Commit {number}", output)
+        self.assertNotIn("not found", output)
+
+    def test_cache_covers_history(self):
+        """Test that a complete cache returns every commit, newest first."""
+        entries, next_hash = commit_change._read_history_cache(self.commit_hashes[-1])
+        self.assertEqual([entry[0] for entry in entries], self.commit_hashes[::-1])
+        self.assertIsNone(next_hash)
+        self.assert_full_history()
+
+    def test_missing_cache(self):
+        """Test that a missing cache falls back to the object store."""
+        os.remove(HISTORY_CACHE_PATH)
+        self.assertIsNone(commit_change._read_history_cache(self.commit_hashes[-1]))
+        self.assert_full_history()
+
+    def test_head_not_at_top_of_cache(self):
+        """Test that a cache whose newest entry is not HEAD is ignored."""
+        self.write_cache_lines(self.read_cache_lines()[:-1])
+        self.assertIsNone(commit_change._read_history_cache(self.commit_hashes[-1]))
+        self.assert_full_history()
+
+    def test_corrupt_last_line(self):
+        """Test that a partially written last line makes the cache ignored."""
+        self.write_cache_lines(self.read_cache_lines() + ['{"hash'])
+        self.assertIsNone(commit_change._read_history_cache(self.commit_hashes[-1]))
+        self.assert_full_history()
+
+    def test_partial_chain_continues_in_object_store(self):
+        """Test that ancestors missing from the cache are read from the object store."""
+        self.write_cache_lines(self.read_cache_lines()[-1:])
+        entries, next_hash = commit_change._read_history_cache(self.commit_hashes[-1])
+        self.assertEqual([entry[0] for entry in entries], [self.commit_hashes[-1]])
+        self.assertEqual(next_hash, self.commit_hashes[1])
+        self.assert_full_history()
+
+    def test_garbled_meta_falls_back_to_commit_object(self):
+        """Test that an unreadable .meta sidecar is ignored in favour of the commit object."""
+        os.remove(HISTORY_CACHE_PATH)
+        with open(f".myscs/objects/{self.commit_hashes[1]}.meta", "w") as meta_file:
+            meta_file.write("garbled")
+        commit_change._commit_meta_cache.clear()
+        self.assert_full_history()
+
+    def test_merge_deletes_cache(self):
+        """Test that a successful merge invalidates the history cache."""
+        with open(".myscs/refs/heads/feature", "w") as branch_file:
+            branch_file.write(self.commit_hashes[0])
+        with mock.patch("commit_change.console"):
+            merge("feature")
+        self.assertFalse(os.path.exists(HISTORY_CACHE_PATH))
+
+
+class TestGetCurrentCommitHash(unittest.TestCase):
+    def setUp(self):
+        """Create a .myscs directory in a temporary directory."""
+        self.original_cwd = os.getcwd()
+        self.repo_dir = tempfile.mkdtemp()
+        os.chdir(self.repo_dir)
+        os.makedirs(".myscs")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.repo_dir)
+
+    def head_hash(self, content):
+        """Write HEAD with the given content and return the parsed commit hash."""
+        # Same-size rewrites within one mtime tick would otherwise hit the HEAD cache
+        commit_change._head_cache.update(stat=None, value=None)
+        with open(".myscs/HEAD", "w") as head_file:
+            head_file.write(content)
+        return get_current_commit_hash()
+
+    def test_ref_with_sha1_hash(self):
+        """Test a branch reference followed by a 40-character hash."""
+        self.assertEqual(self.head_hash("ref: refs/heads/main\n" + "a1" * 20), "a1" * 20)
+
+    def test_ref_with_64_char_hash(self):
+        """Test a branch reference followed by a 64-character hash."""
+        self.assertEqual(self.head_hash("ref: refs/heads/main\n" + "b2" * 32), "b2" * 32)
+
+    def test_bare_hash(self):
+        """Test a HEAD that contains only a commit hash."""
+        self.assertEqual(self.head_hash("c3" * 20 + "\n"), "c3" * 20)
+
+    def test_ref_without_hash(self):
+        """Test a branch reference with no commit yet."""
+        self.assertIsNone(self.head_hash("ref: refs/heads/main\n"))
+
+    def test_same_size_rewrite_with_restored_mtime(self):
+        """Test that rewriting HEAD in place with its old mtime still returns the new hash."""
+        self.assertEqual(self.head_hash("ref: refs/heads/main\n" + "a1" * 20), "a1" * 20)
+        st = os.stat(".myscs/HEAD")
+        with open(".myscs/HEAD", "w") as head_file:
+            head_file.write("ref: refs/heads/main\n" + "b2" * 20)
+        os.utime(".myscs/HEAD", ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(get_current_commit_hash(), "b2" * 20)
+
+    def test_invalid_content(self):
+        """Test that garbage, uppercase and malformed hashes are rejected."""
+        self.assertIsNone(self.head_hash("not a commit hash"))
+        self.assertIsNone(self.head_hash("ref: refs/heads/main\n" + "A1" * 20))
+        self.assertIsNone(self.head_hash("ref: refs/heads/main\n" + "g" * 40))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 import os
-from staging import stage_file  # Import the stage_file function from repoinit.py
+import mmap
+import hashlib
+from unittest import mock
+from staging import stage_file, stage_files, read_index  # Import the staging functions from staging.py
+from utils import hash_file, MMAP_THRESHOLD
 
 class TestStageFile(unittest.TestCase):
     def setUp(self):
@@ -26,7 +30,8 @@ class TestStageFile(unittest.TestCase):
 
     def tearDown(self):
         """Clean up after tests by removing test files and the index file."""
-        for file_path in [self.text_file_path, self.json_file_path, self.binary_file_path, "gitimagetest.png"]:
+        for file_path in [self.text_file_path, self.json_file_path, self.binary_file_path, "gitimagetest.png",
+                          "large.bin"]:
             if os.path.exists(file_path):
                 os.remove(file_path)
         if os.path.exists(".myscs/index"):
@@ -69,5 +74,67 @@ class TestStageFile(unittest.TestCase):
             content = index_file.read()
             self.assertIn(self.binary_file_path, content, "Binary file path not found in the index.")
 
+    def test_hash_large_file(self):
+        """Test that a file above the mmap threshold hashes like hashlib."""
+        data = os.urandom(MMAP_THRESHOLD + 1024)
+        with open("large.bin", "wb") as f:
+            f.write(data)
+        with mock.patch("utils.mmap.mmap", wraps=mmap.mmap) as mmap_mock:
+            file_hash = hash_file("large.bin", "sha256")
+        mmap_mock.assert_called_once()
+        self.assertEqual(file_hash, hashlib.sha256(data).hexdigest())
+
+    def test_stage_multiple_files(self):
+        """Test staging several files at once, with one of them missing."""
+        if os.path.exists(".myscs/index"):
+            os.remove(".myscs/index")
+        with mock.patch("staging.os.write", wraps=os.write) as write_mock, \
+                mock.patch("staging.console") as console_mock:
+            stage_files([self.text_file_path, "missing.txt", self.json_file_path])
+        self.assertEqual(write_mock.call_count, 1, "Entries were not appended in a single write.")
+        printed = " ".join(str(call) for call in console_mock.return_value.print.call_args_list)
+        self.assertIn("File 'missing.txt' not found", printed)
+        with open(".myscs/index", "r") as index_file:
+            content = index_file.read()
+        self.assertIn(self.text_file_path, content)
+        self.assertIn(self.json_file_path, content)
+        self.assertNotIn("missing.txt", content)
+
+    def test_restage_modified_file(self):
+        """Test that staging a modified file again leaves one entry with the new hash."""
+        index_path = ".myscs/index"
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        stage_file(self.text_file_path)
+        with open(self.text_file_path, "w") as f:
+            f.write("The text file was modified after staging.")
+        stage_file(self.text_file_path)
+
+        with open(index_path, "r") as index_file:
+            lines = [line for line in index_file.read().splitlines()
+                     if line.split("\t")[0] == self.text_file_path]
+        self.assertEqual(len(lines), 1, "Re-staged file has more than one index entry.")
+        algorithm, entries = read_index(index_path)
+        self.assertEqual(entries[self.text_file_path][1], hash_file(self.text_file_path, algorithm))
+
+    def test_restage_into_legacy_index(self):
+        """Test that re-staging into a legacy index keeps it SHA-1 and keeps its old lines."""
+        os.makedirs(".myscs", exist_ok=True)
+        index_path = ".myscs/index"
+        binary_sha1 = hashlib.sha1(b"This is binary content for testing.").hexdigest()
+        with open(index_path, "w") as index_file:
+            index_file.write(f"{self.json_file_path} {'0' * 40}\n")
+            index_file.write(f"{self.binary_file_path} {binary_sha1}\n")
+        stage_file(self.json_file_path)
+
+        with open(index_path, "r") as index_file:
+            content = index_file.read()
+        self.assertFalse(content.startswith("# hash: "), "Legacy index gained a hash header.")
+        self.assertIn(f"{self.binary_file_path} {binary_sha1}\n", content)
+        algorithm, entries = read_index(index_path)
+        self.assertEqual(algorithm, "sha1")
+        self.assertEqual(entries[self.json_file_path][1], hashlib.sha1(b'{"key": "value"}').hexdigest())
+        self.assertEqual(content.count(self.json_file_path), 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,91 @@
+import os
+import mmap
+import logging
+import hashlib
+import tempfile
+
+# Rich console for styled output, created on first use to keep imports fast
+_console_instance = None
+
+def console():
+    """
+    Return the shared rich Console, importing rich only when first needed.
+    """
+    global _console_instance
+    if _console_instance is None:
+        from rich.console import Console
+        _console_instance = Console()
+    return _console_instance
+
+# Configure logging
+logger = logging.getLogger("myscs")
+if not logger.handlers:
+    _log_handler = logging.FileHandler("myscs.log", delay=True)
+    _log_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Supported content hash algorithms. SHA-1 is kept only to read legacy indexes.
+# BLAKE3 needs the optional blake3 package and is opt-in through the
+# "hash_algorithm" key in .myscs/config.
+HASH_ALGORITHMS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+}
+try:
+    import blake3
+    HASH_ALGORITHMS["blake3"] = blake3.blake3
+except ImportError:
+    pass
+LEGACY_HASH_ALGORITHM = "sha1"
+HASH_ALGORITHM = "sha256"
+
+# Files smaller than this are hashed from a single read() instead of mmap
+MMAP_THRESHOLD = 1024 * 1024
+
+def new_hasher(data=b"", algorithm=HASH_ALGORITHM):
+    """
+    Return a new hash object for the given algorithm, seeded with data.
+    """
+    return HASH_ALGORITHMS[algorithm](data)
+
+def hash_file(file_path, algorithm=HASH_ALGORITHM, size=None):
+    """
+    Return the hex digest of a file's contents.
+    Large files are mapped into memory and hashed in a single call.
+    Pass size when the caller already has the file's stat to avoid another one.
+    """
+    with open(file_path, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            return new_hasher(f.read(), algorithm).hexdigest()
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            return new_hasher(mm, algorithm).hexdigest()
+
+def write_durable(path, data):
+    """
+    Write bytes to path via a fsynced temporary file that is renamed into place,
+    so readers never see a partially written file.
+    The temporary file has a unique name and is removed if the write fails.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                    prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        # mkstemp creates the file as 0600; keep the usual permissions
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise